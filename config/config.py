@@ -16,6 +16,7 @@ import json
 import os
 from pathlib import Path
 from functools import lru_cache
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 
@@ -77,22 +78,26 @@ def normalize_compression(value):
 
 
 # ---------- ETL-конфиг ----------
+@lru_cache(maxsize=1)
 def get_etl_config():
     """
     Формирует словарь ETL-конфигурации на
     основе INI-файла и переменных окружения.
 
+    Результат кэшируется на весь процесс и возвращается
+    как неизменяемый mapping; для изменения сделайте копию (dict(...)).
+
     Returns
     -------
-    dict
+    MappingProxyType
         Словарь с ключевыми параметрами ETL:
         - chunk_size: int, размер чанка для обработки данных
         - sql_path: str, путь к SQL-файлу
         - export_path: str, директория для экспорта
-        - allowed_formats: list[str], разрешённые форматы экспорта
+        - allowed_formats: tuple[str], разрешённые форматы экспорта
     """
     config = load_config()
-    return {
+    return MappingProxyType({
         'chunk_size': config.getint('ETL',
                                     'chunk_size',
                                     fallback=10000),
@@ -102,10 +107,10 @@ def get_etl_config():
         'export_path': os.getenv('EXPORT_PATH',
                                  config.get('ETL', 'export_path',
                                             fallback='./exports')),
-        'allowed_formats': config.get('ETL', 'allowed_formats').split(','),
+        'allowed_formats': tuple(config.get('ETL', 'allowed_formats').split(',')),
         'export_format': os.getenv('EXPORT_FORMAT', config.get('ETL', 'export_format',
                                                                fallback='csv')),
         'compression': os.getenv('COMPRESSION',
                                  config.get('ETL', 'compression',
-                                            fallback=None))
-    }
+                                            fallback='zstd'))
+    })
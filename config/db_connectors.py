@@ -1,3 +1,4 @@
+from functools import lru_cache
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
@@ -20,6 +21,8 @@ class PostgresConnector:
     -------
     get_engine() -> Engine
         Создаёт и возвращает SQLAlchemy Engine для подключения к PostgreSQL.
+        Engine создаётся один раз на процесс и разделяет пул соединений
+        между всеми вызывающими.
 
     Raises
     ------
@@ -35,6 +38,7 @@ class PostgresConnector:
          conn.execute(text("SELECT 1"))
     """
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_engine() -> Engine:
         required_vars = ['DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT', 'DB_NAME']
         if missing := [var for var in required_vars if not os.getenv(var)]:
@@ -43,7 +47,11 @@ class PostgresConnector:
             return create_engine(
                 f"postgresql+psycopg2://{os.getenv('DB_USER')}"
                 f":{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}"
-                f":{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+                f":{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}",
+                pool_size=5,
+                max_overflow=10,
+                pool_pre_ping=True,
+                pool_recycle=1800
             )
         except SQLAlchemyError as e:  # Ловим только ошибки SQLAlchemy
             logger.error(f"Ошибка подключения к БД: {e}")
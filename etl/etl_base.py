@@ -5,11 +5,74 @@ from pathlib import Path
 from typing import Iterator, Optional, Dict, Any, Callable
 from config.config import get_etl_config, logger, normalize_compression
 from modules.decorators import error_handler
-from modules.notifications import NotificationSubject, EmailObserver, TelegramObserver
+from modules.notifications import NotificationSubject, get_email_observer, get_telegram_observer
 from datetime import datetime
+import queue
+import threading
 import time
-from memory_profiler import memory_usage  # type: ignore
+import psutil
 from modules.containers import Container
+from strategies.saver_strategy import is_single_chunk
+
+# Расширения файлов, отличающиеся от названия сжатия (zstd → .zst)
+_COMPRESSION_EXTENSIONS = {'zstd': 'zst'}
+# Сколько чанков может ждать записи, пока читается следующий
+_PREFETCH_CHUNKS = 2
+_DONE = object()
+
+
+class _ProducerError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _prefetch(data: Iterator[pd.DataFrame], maxsize: int = _PREFETCH_CHUNKS) -> Iterator[pd.DataFrame]:
+    """
+    Читает чанки в фоновом потоке через ограниченную очередь.
+
+    Чтение из БД (psycopg2) и запись файла (pyarrow/pandas) отпускают GIL,
+    поэтому выборка следующего чанка идёт параллельно с записью текущего.
+    Ошибка источника пробрасывается в поток-потребитель; при досрочной
+    остановке потребителя источник закрывается.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in data:
+                if not put(chunk):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            close = getattr(data, 'close', None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name='etl-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        producer.join()
 
 
 class ETLBase(ABC):
@@ -29,7 +92,21 @@ class ETLBase(ABC):
         Загружает данные в файл.
     run()
         Запускает полный ETL-процесс.
+
+    Attributes
+    ----------
+    IDENTITY_TRANSFORM : bool
+        True, если transform возвращает данные без изменений; тогда run
+        передаёт результат extract в load напрямую. Сбрасывается в False
+        у подклассов, переопределяющих transform без явного флага.
     """
+    IDENTITY_TRANSFORM = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'transform' in cls.__dict__ and 'IDENTITY_TRANSFORM' not in cls.__dict__:
+            cls.IDENTITY_TRANSFORM = False
+
     def __init__(self, container: Container, send_email=False, send_telegram=False, **kwargs) -> None:
         self.container = container
         self.config = get_etl_config()
@@ -39,10 +116,15 @@ class ETLBase(ABC):
         self.type = kwargs.get('type', 'postgres')
         self.export_format = kwargs.get('export_format', self.config['export_format'])
         self.compression = kwargs.get('compression', self.config['compression'])
+        self._compression_norm = normalize_compression(self.compression)
+        self._ext_suffix = (f".{_COMPRESSION_EXTENSIONS.get(self._compression_norm, self._compression_norm)}"
+                            if self._compression_norm else "")
         self.exports_path = Path(kwargs.get('export_path') or self.config.get('export_path') or './exports')
         self.exports_path.mkdir(parents=True, exist_ok=True)
         self.sql_path = kwargs.get('sql_path', self.config.get('sql_path'))
         self.chunk_size = kwargs.get('chunk_size', self.config.get('chunk_size'))
+        # Необязательная числовая функция над чанками (см. strategies.saver_strategy.numeric_kernel)
+        self.numeric_transform = kwargs.get('numeric_transform')
         self.send_email = send_email
         self.send_telegram = send_telegram
         self.metrics: Dict[str, Any] = {
@@ -50,12 +132,11 @@ class ETLBase(ABC):
             'memory_usage': [],
             'rows_processed': 0
             }
+        self._process = psutil.Process()
 
     def _build_filename(self) -> str:
         timestamp = datetime.now().strftime('%d.%m.%Y_%H-%M-%S')
-        compression = normalize_compression(self.compression)
-        ext = f".{compression}" if compression and compression != "none" else ""
-        return f"export_{timestamp}.{getattr(self, 'export_format', 'csv')}{ext}"
+        return f"export_{timestamp}.{self.export_format}{self._ext_suffix}"
 
     def generate_filename(self) -> Path:
         return self.exports_path / self._build_filename()
@@ -64,20 +145,22 @@ class ETLBase(ABC):
     def run(self):
         self.logger.info(
             "Параметры запуска:\n"
-            f"  Тип          : {self.type}\n"
-            f"  Путь к SQL   : {self.sql_path}\n"
-            f"  Расширение   : {self.export_format}\n"
-            f"  Сжатие       : {self.compression}\n"
-            f"  Директория   : {self.exports_path}\n"
-            f"  Размер чанка : {self.chunk_size}\n"
-            f"  E-mail       : {self.send_email}\n"
-            f"  Telegram     : {self.send_telegram}"
+            "  Тип          : %s\n"
+            "  Путь к SQL   : %s\n"
+            "  Расширение   : %s\n"
+            "  Сжатие       : %s\n"
+            "  Директория   : %s\n"
+            "  Размер чанка : %s\n"
+            "  E-mail       : %s\n"
+            "  Telegram     : %s",
+            self.type, self.sql_path, self.export_format, self.compression,
+            self.exports_path, self.chunk_size, self.send_email, self.send_telegram
         )
         self.metrics['start_time'] = time.time()
         self.metrics['rows_processed'] = 0
         try:
             data = self.extract()
-            transformed = self.transform(data)
+            transformed = data if self.IDENTITY_TRANSFORM else self.transform(data)
             self.load(transformed)
         finally:
             self._send_report()
@@ -87,10 +170,11 @@ class ETLBase(ABC):
         duration = time.time() - self.metrics['start_time']
         max_mem = max(self.metrics['memory_usage']) if self.metrics['memory_usage'] else 0
         logger.info(
-            f"Метрики выполнения:\n"
-            f"  Время             : {duration:.2f} сек\n"
-            f"  Пиковая память    : {max_mem:.2f} MiB\n"
-            f"  Обработано строк  : {self.metrics['rows_processed']}"
+            "Метрики выполнения:\n"
+            "  Время             : %.2f сек\n"
+            "  Пиковая память    : %.2f MiB\n"
+            "  Обработано строк  : %s",
+            duration, max_mem, self.metrics['rows_processed']
         )
 
     @abstractmethod
@@ -105,22 +189,28 @@ class ETLBase(ABC):
     @error_handler(log_message="Ошибка загрузки данных", notify=True)
     def load(self, data: Iterator[pd.DataFrame], metrics_callback: Optional[Callable] = None) -> None:
 
-        saver = self.container.saver_strategy_map()[self.export_format]
+        saver = self.container.saver_factory(self.export_format)
         self.filename = self.generate_filename()
 
-        total_rows = saver.save(
-            data=data,
-            filepath=self.filename,
-            compression=self.compression,
-            metrics_callback=self._update_metrics
-        )
+        chunks = data if is_single_chunk(data) else _prefetch(data)
+        try:
+            total_rows = saver.save(
+                data=chunks,
+                filepath=self.filename,
+                compression=self.compression,
+                metrics_callback=self._update_metrics,
+                transform=self.numeric_transform
+            )
+        finally:
+            if chunks is not data:
+                chunks.close()
         if total_rows == 0:
             raise ValueError("Нет данных для сохранения")
         self.logger.info(f"Данные сохранены в папку {self.exports_path}")
 
     def _update_metrics(self, rows: int):
         self.metrics['rows_processed'] += rows
-        self.metrics['memory_usage'].append(memory_usage(proc=-1, interval=0.5, backend='psutil', max_usage=True))
+        self.metrics['memory_usage'].append(self._process.memory_info().rss / (1024 * 1024))
 
     @error_handler(log_message="Ошибка отправки отчета", notify=True)
     def _send_report(self) -> None:
@@ -129,9 +219,9 @@ class ETLBase(ABC):
 
         subject = NotificationSubject()
         if getattr(self, "send_email", False):
-            subject.attach(EmailObserver())
+            subject.attach(get_email_observer())
         if getattr(self, "send_telegram", False):
-            subject.attach(TelegramObserver())
+            subject.attach(get_telegram_observer())
 
         subject.notify(
             f"ETL завершен. Файл: {Path(self.filename).name}",
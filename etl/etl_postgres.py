@@ -1,11 +1,32 @@
+import codecs
+import os
+import re
 import pandas as pd
+from functools import lru_cache
 from pathlib import Path
 from sqlalchemy import text
-from typing import Iterator
+from typing import Iterator, Optional, Callable
 from config.db_connectors import PostgresConnector
 from modules.decorators import error_handler
 from etl.etl_base import ETLBase
 from modules.unit_of_work import UnitOfWork
+from strategies.saver_strategy import SaverStrategy, _STREAM_COMPRESSORS
+
+# Сжатия, которые поток COPY может писать напрямую без pandas (те же компрессоры, что у сохранений)
+_COPY_COMPRESSIONS = frozenset({None, *_STREAM_COMPRESSORS})
+# Завершающая ';' вместе с идущими после неё пробелами и комментариями
+_TRAILING_SEMICOLON = re.compile(r';(?:\s|--[^\n]*|/\*.*?\*/)*\Z', re.S)
+
+
+@lru_cache(maxsize=64)
+def _load_sql(path: str, mtime: float) -> str:
+    """Читает SQL-файл; mtime в ключе кэша сбрасывает его при изменении файла."""
+    return Path(path).read_text(encoding='utf-8')
+
+
+@lru_cache(maxsize=64)
+def _compile_sql(sql: str):
+    return text(sql)
 
 
 class PostgresETL(ETLBase):
@@ -15,13 +36,32 @@ class PostgresETL(ETLBase):
     Поддерживает чтение SQL-запроса из строки или файла, обработку данных чанками,
     а также интеграцию с системой Unit of Work для управления сессиями.
 
+    Для экспорта в CSV без трансформаций данные выгружаются напрямую
+    через ``COPY (query) TO STDOUT``, минуя pandas. Значения в этом случае
+    форматирует PostgreSQL (boolean как t/f, даты и время в текстовом виде
+    PostgreSQL), поэтому файл отличается от выгрузки через Arrow/pandas,
+    которая используется для сжатий zip, tar и infer. Подкласс, переопределивший
+    extract, выгружается через extract, если не задаёт COPY_EXPORT = True явно.
+
     Methods
     -------
     extract() -> Iterator[pd.DataFrame]
         Извлекает данные из PostgreSQL по заданному SQL-запросу, возвращая итератор DataFrame.
     transform(data: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]
         Возвращает данные без изменений (заглушка для трансформаций).
+    load(data, metrics_callback=None)
+        Сохраняет данные; для CSV без трансформаций использует COPY.
     """
+    IDENTITY_TRANSFORM = True
+    # COPY выгружает результат _read_sql и минует extract
+    COPY_EXPORT = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Подкласс со своим extract (другой запрос, параметры или источник) не должен уходить в COPY
+        if 'extract' in cls.__dict__ and 'COPY_EXPORT' not in cls.__dict__:
+            cls.COPY_EXPORT = False
+
     def __init__(self,
                  container,
                  sql_text=None,
@@ -31,18 +71,22 @@ class PostgresETL(ETLBase):
         self.sql_text = sql_text
         self.uow = UnitOfWork()
 
+    def _read_sql(self) -> str:
+        if self.sql_text:
+            return self.sql_text
+        if not Path(self.sql_path).exists():
+            raise FileNotFoundError(f"SQL-файл не найден: {self.sql_path}")
+        return _load_sql(str(self.sql_path), os.path.getmtime(self.sql_path))
+
     @error_handler(log_message="Ошибка извлечения данных", notify=True)
     def extract(self) -> Iterator[pd.DataFrame]:
-        if self.sql_text:
-            sql_query = text(self.sql_text)
-        else:
-            if not Path(self.sql_path).exists():
-                raise FileNotFoundError(f"SQL-файл не найден: {self.sql_path}")
-            with open(self.sql_path, 'r', encoding='utf-8') as f:
-                sql_query = text(f.read())
+        sql_query = _compile_sql(self._read_sql())
         with self.uow.session_scope() as session:
+            # Серверный курсор: строки приходят порциями, а не всей выборкой сразу
+            connection = session.connection(execution_options={'stream_results': True,
+                                                               'max_row_buffer': self.chunk_size})
             yield from pd.read_sql(sql_query,
-                                   session.connection(),
+                                   connection,
                                    chunksize=self.chunk_size,
                                    dtype_backend='pyarrow'
                                    )
@@ -50,3 +94,40 @@ class PostgresETL(ETLBase):
     def transform(self,
                   data: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
         return data
+
+    def _can_copy_direct(self) -> bool:
+        return (self.export_format == 'csv'
+                and self.COPY_EXPORT
+                and self.IDENTITY_TRANSFORM
+                and self.numeric_transform is None
+                and self._compression_norm in _COPY_COMPRESSIONS)
+
+    def load(self, data: Iterator[pd.DataFrame], metrics_callback: Optional[Callable] = None) -> None:
+        if self._can_copy_direct():
+            # Генератор extract ещё не запущен, поэтому запрос через pandas не выполнялся
+            self._copy_to_file()
+            return
+        super().load(data, metrics_callback)
+
+    @error_handler(log_message="Ошибка выгрузки данных через COPY", notify=True)
+    def _copy_to_file(self) -> None:
+        sql = _TRAILING_SEMICOLON.sub('', self._read_sql().strip())
+        self.filename = self.generate_filename()
+
+        conn = self.engine.raw_connection()
+        try:
+            with SaverStrategy._open_output(self.filename, self._compression_norm) as f, conn.cursor() as cur:
+                # BOM, как у CsvSaver (encoding='utf-8-sig')
+                f.write(codecs.BOM_UTF8)
+                # Перевод строки перед ')' - чтобы завершающий '--' комментарий не съел скобку
+                cur.copy_expert(f"COPY (\n{sql}\n) TO STDOUT WITH (FORMAT csv, HEADER, ENCODING 'UTF8')", f)
+                rows = cur.rowcount
+            conn.commit()
+        finally:
+            conn.close()
+
+        if rows <= 0:
+            self.filename.unlink(missing_ok=True)
+            raise ValueError("Нет данных для сохранения")
+        self._update_metrics(rows)
+        self.logger.info(f"Данные сохранены в папку {self.exports_path}")
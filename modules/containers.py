@@ -3,6 +3,11 @@ from dependency_injector import containers, providers
 from strategies.saver_strategy import CsvSaver, ExcelSaver, JsonSaver, ParquetSaver
 
 
+def saver_for(fmt: str, factories: dict):
+    """Создаёт стратегию сохранения для формата fmt; остальные фабрики не вызываются."""
+    return factories[fmt]()
+
+
 class Container(containers.DeclarativeContainer):
     """
 DI-контейнер для управления стратегиями сохранения данных.
@@ -21,10 +26,10 @@ json_saver : providers.Factory
 parquet_saver : providers.Factory
     Фабрика для создания экземпляров ParquetSaver
 
-saver_strategy_map : providers.Dict
-    Словарь для сопоставления форматов (csv, xlsx и др.) с фабриками стратегий
 saver_factory : providers.Callable
-    Фабричный метод для получения стратегии по ключу формата
+    Фабричный метод для получения стратегии по ключу формата.
+    Создаёт только запрошенную стратегию через провайдеры выше,
+    поэтому их переопределение (override) действует и здесь.
 
 Examples
 --------
@@ -35,7 +40,7 @@ Notes
 -----
 Для добавления новой стратегии:
 1. Зарегистрируйте фабрику стратегии
-2. Добавьте запись в saver_strategy_map
+2. Добавьте её в словарь factories у saver_factory
 """
     # Регистрация стратегий сохранения
     csv_saver = providers.Factory(CsvSaver)
@@ -43,14 +48,13 @@ Notes
     json_saver = providers.Factory(JsonSaver)
     parquet_saver = providers.Factory(ParquetSaver)
 
-    # Словарь стратегий
-    saver_strategy_map = providers.Dict({
-        'csv': csv_saver,
-        'xlsx': xlsx_saver,
-        'json': json_saver,
-        'parquet': parquet_saver
-    })
-
-    saver_factory = providers.Callable(lambda strategy_map,
-                                       fmt: strategy_map[fmt](),
-                                       strategy_map=saver_strategy_map)
+    # В словарь передаются сами провайдеры (.provider), а не созданные ими объекты
+    saver_factory = providers.Callable(
+        saver_for,
+        factories=providers.Dict(
+            csv=csv_saver.provider,
+            xlsx=xlsx_saver.provider,
+            json=json_saver.provider,
+            parquet=parquet_saver.provider
+        )
+    )
@@ -1,7 +1,7 @@
 from functools import wraps
 from typing import Callable, Optional, Any
 from config.config import logger
-from modules.notifications import NotificationSubject, TelegramObserver
+from modules.notifications import NotificationSubject, get_telegram_observer
 """
 Модуль декораторов для обработки ошибок и уведомлений в ETL-процессах.
 
@@ -11,6 +11,8 @@ from modules.notifications import NotificationSubject, TelegramObserver
 - Отправка уведомлений (NotificationDecorator)
 
 Содержит фабрику error_handler для удобного применения всей цепочки через один декоратор.
+error_handler не строит цепочку из классов, а реализует то же поведение одной
+плоской обёрткой; классы остаются для ручной сборки цепочек.
 
 Классы
 ------
@@ -25,9 +27,12 @@ NotificationDecorator
 
 Функции
 -------
-error_handler(log_message=None, notify=True, retries=0)
+error_handler(log_message=None, notify=True, retries=0, log=True)
     Фабрика для создания цепочки декораторов с нужными параметрами.
 
+Уведомления об ошибках отправляются через общий для модуля NotificationSubject,
+поэтому соединения наблюдателей переиспользуются между исключениями.
+
 Пример использования
 --------------------
 @error_handler(log_message="Ошибка загрузки", notify=True, retries=2)
@@ -36,6 +41,35 @@ def my_func(...):
 """
 
 
+def _build_error_subject() -> NotificationSubject:
+    # Серии ошибок склеиваются в одно сообщение; субъект один на процесс
+    subject = NotificationSubject(batch_window=0.5)
+    try:
+        subject.attach(get_telegram_observer())
+    except Exception as e:
+        logger.warning(f"Не удалось инициализировать Telegram-уведомления: {str(e)}")
+    return subject
+
+
+_SUBJECT = _build_error_subject()
+
+
+def _first_report(error: BaseException) -> bool:
+    """
+    True, если трассировка этого исключения ещё не логировалась.
+
+    Исключение проходит через несколько декорированных уровней (load → run),
+    и трассировку достаточно записать один раз - на самом нижнем.
+    """
+    if getattr(error, '_etl_traceback_logged', False):
+        return False
+    try:
+        error._etl_traceback_logged = True  # type: ignore[attr-defined]
+    except AttributeError:
+        pass
+    return True
+
+
 class ErrorHandlerDecorator:
     """Базовый класс для декораторов обработки ошибок"""
     def __init__(self, component: Optional['ErrorHandlerDecorator'] = None):
@@ -56,14 +90,18 @@ class RetryDecorator(ErrorHandlerDecorator):
         self.retries = retries
 
     def handle(self, func: Callable) -> Callable:
+        inner = super().handle(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             for attempt in range(self.retries + 1):
                 try:
-                    return super(RetryDecorator, self).handle(func)(*args, **kwargs)
-                except Exception:
+                    return inner(*args, **kwargs)
+                except Exception as e:
                     if attempt == self.retries:
                         raise
+                    logger.warning("Попытка %d из %d для %s не удалась: %s: %s", attempt + 1,
+                                   self.retries + 1, func.__name__, e.__class__.__name__, e)
             return None
         return wrapper
 
@@ -77,14 +115,15 @@ class LoggingDecorator(ErrorHandlerDecorator):
         self.log_message = log_message
 
     def handle(self, func: Callable) -> Callable:
+        inner = super().handle(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             try:
-                return super(LoggingDecorator, self).handle(func)(*args, **kwargs)
+                return inner(*args, **kwargs)
             except Exception as e:
                 error_msg = self.log_message or f"Error in {func.__name__}"
-                error_details = f"{e.__class__.__name__}: {e}"
-                logger.error(f"{error_msg}: {error_details}", exc_info=True)
+                logger.error("%s: %s: %s", error_msg, e.__class__.__name__, e, exc_info=_first_report(e))
                 raise
         return wrapper
 
@@ -98,15 +137,15 @@ class NotificationDecorator(ErrorHandlerDecorator):
         self.notify = notify
 
     def handle(self, func: Callable) -> Callable:
+        inner = super().handle(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             try:
-                return super(NotificationDecorator, self).handle(func)(*args, **kwargs)
+                return inner(*args, **kwargs)
             except Exception as e:
                 if self.notify:
-                    subject = NotificationSubject()
-                    subject.attach(TelegramObserver())
-                    subject.notify(f"Ошибка в {func.__name__}: {str(e)}")
+                    _SUBJECT.notify(f"Ошибка в {func.__name__}: {str(e)}")
                 raise
         return wrapper
 
@@ -114,13 +153,55 @@ class NotificationDecorator(ErrorHandlerDecorator):
 def error_handler(
     log_message: Optional[str] = None,
     notify: bool = True,
-    retries: int = 0
+    retries: int = 0,
+    log: bool = True
 ) -> Callable:
-    """Фабрика для создания цепочки декораторов"""
+    """
+    Фабрика для создания цепочки декораторов.
+
+    Поведение цепочки Retry → Logging → Notification собрано в одну обёртку,
+    которая создаётся один раз при декорировании: вызов проходит через один
+    дополнительный кадр вместо вложенных обёрток классов.
+
+    Обёртка выбирается при декорировании: без повторов цикл попыток не строится,
+    а при ``retries=0``, ``notify=False`` и ``log=False`` функция
+    возвращается без обёртки.
+    """
     def decorator(func: Callable) -> Callable:
-        # Создаем цепочку декораторов
-        handler: ErrorHandlerDecorator = RetryDecorator(retries)
-        handler = LoggingDecorator(log_message, handler)
-        handler = NotificationDecorator(notify, handler)
-        return handler.handle(func)
+        if retries == 0 and not notify and not log:
+            return func
+
+        error_msg = log_message or f"Error in {func.__name__}"
+
+        def report(e: Exception) -> None:
+            if log:
+                logger.error("%s: %s: %s", error_msg, e.__class__.__name__, e, exc_info=_first_report(e))
+            if notify:
+                _SUBJECT.notify(f"Ошибка в {func.__name__}: {str(e)}")
+
+        if retries == 0:
+            @wraps(func)
+            def wrapper(*args, **kwargs) -> Any:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    report(e)
+                    raise
+            return wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            for attempt in range(retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt < retries:
+                        # Промежуточные попытки - без трассировки
+                        logger.warning("Попытка %d из %d для %s не удалась: %s: %s", attempt + 1,
+                                       retries + 1, func.__name__, e.__class__.__name__, e)
+                        continue
+                    report(e)
+                    raise
+            return None
+        return wrapper
     return decorator
@@ -1,11 +1,18 @@
+import atexit
+import base64
+import mmap
 import os
 import smtplib
+import threading
+import weakref
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
-from email import encoders
-from typing import List
+from typing import Deque, Optional, Tuple
 from config.config import logger
 """
 Модуль уведомлений с реализацией паттерна "Наблюдатель" для ETL-системы.
@@ -24,6 +31,13 @@ TelegramObserver
 NotificationSubject
     Субъект для управления подписчиками и рассылки уведомлений всем наблюдателям.
 
+Функции
+-------
+get_email_observer()
+    Общий на процесс EmailObserver с переиспользуемым SMTP-соединением.
+get_telegram_observer()
+    Общий на процесс TelegramObserver.
+
 Пример использования
 --------------------
 subject = NotificationSubject()s
@@ -33,6 +47,17 @@ subject.notify("ETL завершён", subject="Результаты", attachmen
 """
 
 
+# Открытые SMTP-соединения закрываются одним atexit-обработчиком;
+# слабые ссылки не удерживают наблюдателей до конца процесса
+_EMAIL_OBSERVERS: "weakref.WeakSet[EmailObserver]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_email_observers() -> None:
+    for observer in list(_EMAIL_OBSERVERS):
+        observer.close()
+
+
 # --- Интерфейс наблюдателя ---
 class Observer:
     def update(self, message: str, **kwargs):
@@ -50,11 +75,46 @@ class EmailObserver(Observer):
             'sender': os.getenv('EMAIL_SENDER'),
             'recipient': os.getenv('EMAIL_RECIPIENT')
         }
+        self._enabled = all(self.email_config.values())
+        self._smtp = None
+        self._smtp_lock = threading.Lock()
+        _EMAIL_OBSERVERS.add(self)
+
+    def _get_smtp(self) -> smtplib.SMTP_SSL:
+        """Возвращает живое SMTP-соединение, переподключаясь при необходимости."""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except OSError:  # SMTPException и сетевые ошибки
+                pass
+            # Соединение устарело - закрываем сокет, а не только сбрасываем ссылку
+            try:
+                self._smtp.close()
+            except OSError:
+                pass
+            self._smtp = None
+        smtp = smtplib.SMTP_SSL(self.email_config['smtp_server'],
+                                self.email_config['smtp_port'])
+        smtp.login(self.email_config['user'], self.email_config['password'])
+        self._smtp = smtp
+        return smtp
+
+    def close(self) -> None:
+        with self._smtp_lock:
+            if self._smtp is None:
+                return
+            try:
+                self._smtp.quit()
+            except Exception as e:
+                logger.debug(f"Ошибка закрытия SMTP-соединения: {str(e)}")
+            finally:
+                self._smtp = None
 
     def update(self, message: str, **kwargs):
         subject = kwargs.get("subject", "Уведомление")
         attachment_path = kwargs.get("attachment_path")
-        if not all(self.email_config.values()):
+        if not self._enabled:
             logger.warning("Попытка отправки email без полной конфигурации")
             return False
         try:
@@ -65,10 +125,8 @@ class EmailObserver(Observer):
             msg.attach(MIMEText(message, "plain"))
             if attachment_path:
                 self._attach_file(msg, attachment_path)
-            with smtplib.SMTP_SSL(self.email_config['smtp_server'],
-                                  self.email_config['smtp_port']) as smtp:
-                smtp.login(self.email_config['user'], self.email_config['password'])
-                smtp.send_message(msg)
+            with self._smtp_lock:
+                self._get_smtp().send_message(msg)
             logger.info(f"Email отправлен: {subject}")
             return True
         except Exception as e:
@@ -78,57 +136,139 @@ class EmailObserver(Observer):
     def _attach_file(self, msg: MIMEMultipart, file_path: str) -> None:
         try:
             with open(file_path, "rb") as attachment:
-                part = MIMEBase("application", "octet-stream")
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header("Content-Disposition",
-                                f"attachment; filename={os.path.basename(file_path)}")
-                msg.attach(part)
+                if os.fstat(attachment.fileno()).st_size:
+                    # Файл отображается в память (страничный кэш), а не копируется в кучу
+                    with mmap.mmap(attachment.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        encoded = base64.encodebytes(mm)
+                else:
+                    encoded = b""  # mmap не работает с пустыми файлами
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(encoded.decode("ascii"))
+            part["Content-Transfer-Encoding"] = "base64"
+            part.add_header("Content-Disposition",
+                            f"attachment; filename={os.path.basename(file_path)}")
+            msg.attach(part)
         except Exception as e:
             logger.warning(f"Ошибка прикрепления файла: {str(e)}")
             raise
 
 
+@lru_cache(maxsize=1)
+def get_email_observer() -> EmailObserver:
+    """Общий на процесс EmailObserver: SMTP-соединение переиспользуется между запусками."""
+    return EmailObserver()
+
+
+@lru_cache(maxsize=1)
+def _tg_transport() -> Tuple[requests.Session, ThreadPoolExecutor]:
+    """Один пул потоков и одна HTTPS-сессия на процесс для всех TelegramObserver."""
+    executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="tg-notify")
+    atexit.register(executor.shutdown, wait=True)
+    return requests.Session(), executor
+
+
 # --- Реализация Telegram-уведомления ---
 class TelegramObserver(Observer):
+    """
+    Отправляет сообщения в Telegram в фоновом пуле потоков.
+
+    update ставит отправку в очередь и сразу возвращает управление, чтобы
+    сетевой запрос не задерживал ETL. Пул и requests.Session общие для всех
+    экземпляров (см. _tg_transport); при завершении процесса очередь дописывается.
+    """
     def __init__(self):
         self.tg_config = {
             'token': os.getenv('TELEGRAM_BOT_TOKEN'),
             'chat_id': os.getenv('TELEGRAM_CHAT_ID')
         }
+        token, self._chat_id = self.tg_config['token'], self.tg_config['chat_id']
+        self._enabled = bool(token and self._chat_id)
+        self._url = f'https://api.telegram.org/bot{token}/sendMessage' if self._enabled else None
+        self._session, self._executor = _tg_transport()
 
     def update(self, message: str, **kwargs):
-        if not all(self.tg_config.values()):
+        if not self._enabled:
             logger.warning("Попытка отправки в Telegram без полной конфигурации")
             return False
+        payload = {'chat_id': self._chat_id, 'text': message}
         try:
-            url = f'https://api.telegram.org/bot{self.tg_config["token"]}/sendMessage'
-            response = requests.post(
-                url,
-                json={'chat_id': self.tg_config["chat_id"], 'text': message},
-                timeout=10
-            )
+            self._executor.submit(self._send, payload)
+        except RuntimeError:
+            # Пул уже остановлен (завершение процесса) - отправляем синхронно
+            return self._send(payload)
+        return True
+
+    def _send(self, payload: dict) -> bool:
+        try:
+            response = self._session.post(self._url, json=payload, timeout=10)
             response.raise_for_status()
-            logger.info(f"Telegram сообщение отправлено: {message[:50]}...")
+            logger.info(f"Telegram сообщение отправлено: {payload['text'][:50]}...")
             return True
         except Exception as e:
             logger.warning(f"Ошибка отправки в Telegram: {str(e)}")
             return False
 
 
+@lru_cache(maxsize=1)
+def get_telegram_observer() -> TelegramObserver:
+    """Общий на процесс TelegramObserver."""
+    return TelegramObserver()
+
+
 # --- Субъект (Subject) для управления подписчиками ---
 class NotificationSubject:
-    def __init__(self):
-        self._observers: List[Observer] = []  # type: ignore
+    """
+    Рассылает уведомления всем подписанным наблюдателям.
+
+    По умолчанию (batch_window=0) уведомления отправляются сразу. При
+    batch_window > 0 простые текстовые сообщения (без дополнительных параметров)
+    копятся batch_window секунд и уходят одним сообщением, разделённым "---":
+    серия ошибок превращается в один запрос вместо нескольких.
+    Сообщения с параметрами (subject, attachment_path и т.д.) или с urgent=True
+    отправляются сразу. Остаток буфера отправляется при завершении процесса.
+    """
+    def __init__(self, batch_window: float = 0.0):
+        # Кортеж: подписчики меняются редко, а notify перебирает их на каждое событие
+        self._observers: Tuple[Observer, ...] = ()
+        self._batch_window = batch_window
+        self._buffer: Deque[str] = deque()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
 
     def attach(self, observer: Observer):
         if observer not in self._observers:
-            self._observers.append(observer)
+            self._observers = self._observers + (observer,)
 
     def detach(self, observer: Observer):
         if observer in self._observers:
-            self._observers.remove(observer)
+            self._observers = tuple(o for o in self._observers if o is not observer)
+
+    def notify(self, message: str, urgent: bool = False, **kwargs):
+        if urgent or kwargs or self._batch_window <= 0:
+            self._dispatch(message, **kwargs)
+            return
+        with self._lock:
+            self._buffer.append(message)
+            if self._flush_timer is None:
+                if not self._atexit_registered:
+                    atexit.register(self.flush)
+                    self._atexit_registered = True
+                self._flush_timer = threading.Timer(self._batch_window, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._buffer:
+                return
+            message = "\n---\n".join(self._buffer)
+            self._buffer.clear()
+        self._dispatch(message)
 
-    def notify(self, message: str, **kwargs):
+    def _dispatch(self, message: str, **kwargs):
         for observer in self._observers:
             observer.update(message, **kwargs)
@@ -1,9 +1,19 @@
+import logging
 from contextlib import contextmanager
+from functools import lru_cache
 from sqlalchemy.orm import sessionmaker
 from config.db_connectors import PostgresConnector
 from config.config import logger
 
 
+@lru_cache(maxsize=1)
+def _get_session_factory() -> sessionmaker:
+    return sessionmaker(bind=PostgresConnector.get_engine(),
+                        autocommit=False,
+                        autoflush=False
+                        )
+
+
 class UnitOfWork:
     """
     Менеджер единицы работы для управления транзакциями и сессиями БД.
@@ -18,6 +28,9 @@ class UnitOfWork:
     session_factory : sessionmaker
         Фабрика для создания новых сессий БД.
 
+    Engine и sessionmaker общие для всех экземпляров в процессе,
+    поэтому создание UnitOfWork не создаёт новый пул соединений.
+
     Methods
     -------
     session_scope()
@@ -31,10 +44,7 @@ class UnitOfWork:
     """
     def __init__(self):
         self.engine = PostgresConnector.get_engine()
-        self.session_factory = sessionmaker(bind=self.engine,
-                                            autocommit=False,
-                                            autoflush=False
-                                            )
+        self.session_factory = _get_session_factory()
 
     @contextmanager
     def session_scope(self):
@@ -46,7 +56,8 @@ class UnitOfWork:
             logger.debug("Коммит транзакции")
         except Exception as e:
             session.rollback()
-            logger.error(f"Ошибка транзакции: {str(e)}", exc_info=True)
+            # Трассировку пишет внешний error_handler; здесь - только в режиме DEBUG
+            logger.error("Ошибка транзакции: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             raise
         finally:
             session.close()
@@ -1,16 +1,115 @@
+import bz2
+import codecs
+import datetime as dt
+import gzip
+import lzma
+import os
+import tarfile
+import tempfile
+import zipfile
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from decimal import Decimal
 from pathlib import Path
 from typing import Iterator, Union, Optional, Callable
+import numpy as np
+import orjson
 import pandas as pd
 from config.config import logger, normalize_compression
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # CSV/JSON/Excel остаются доступны через pandas
+    pa = pacsv = pq = None
+
+# Сжатия, которые умеет потоковый CSV-писатель PyArrow
+_ARROW_CSV_COMPRESSIONS = {'gzip', 'bz2', 'zstd', 'lz4'}
+# Буфер записи: мелкие записи чанков сливаются в крупные системные вызовы
+_WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+# Потоки для конвертации pandas → Arrow
+_ARROW_THREADS = os.cpu_count() or 1
+# Кодеки, поддерживаемые Parquet; остальные значения (кроме None) заменяются на zstd
+_PARQUET_COMPRESSIONS = {'snappy', 'gzip', 'brotli', 'zstd', 'lz4'}
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+# Сколько данных можно придержать, пока у колонок без значений не появится настоящий тип
+_SCHEMA_HOLDBACK_BYTES = 32 * 1024 * 1024
+
+Chunk = Union[pd.DataFrame, 'pa.Table', 'pa.RecordBatch']
+NumericTransform = Callable[[np.ndarray], np.ndarray]
+
+
+def numeric_kernel(func: NumericTransform, **njit_options) -> NumericTransform:
+    """
+    Компилирует числовую функцию для параметра transform через Numba.
+
+    По умолчанию использует njit(cache=True), чтобы не перекомпилировать
+    функцию при каждом запуске процесса; для стабильного типа входа
+    передайте signature, например "float64[:, :](float64[:, :])".
+    Если Numba не установлена, функция возвращается без изменений.
+
+    Examples
+    --------
+    @numeric_kernel
+    def clip_negative(arr):
+        return np.maximum(arr, 0.0)
+
+    CsvSaver().save(chunks, path, transform=clip_negative)
+    """
+    try:
+        import numba
+    except ImportError:
+        logger.debug("Numba не установлена, %s выполняется без компиляции", func.__name__)
+        return func
+    signature = njit_options.pop('signature', None)
+    njit_options.setdefault('cache', True)
+    if signature is not None:
+        return numba.njit(signature, **njit_options)(func)
+    return numba.njit(**njit_options)(func)
+
+
+def _zstd_writer(raw):
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+
+
+# Потоковые компрессоры поверх уже открытого буферизованного файла
+_STREAM_COMPRESSORS = {
+    'gzip': lambda raw: gzip.GzipFile(fileobj=raw, mode='wb'),
+    'bz2': lambda raw: bz2.BZ2File(raw, 'wb'),
+    'xz': lambda raw: lzma.LZMAFile(raw, 'wb'),
+    'zstd': _zstd_writer,
+}
+
+
+def is_single_chunk(data) -> bool:
+    """True для одиночного чанка (DataFrame или Arrow-таблица), False для итератора чанков."""
+    return isinstance(data, pd.DataFrame) or (pa is not None and isinstance(data, (pa.Table, pa.RecordBatch)))
+
+
+def _json_default(value):
+    """Сериализация типов, которые orjson не знает (pandas/Arrow-скаляры)."""
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, dt.time)):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
 
 class SaverStrategy(ABC):
     """
 Модуль стратегий сохранения данных в различных форматах.
 
-Реализует паттерн Strategy для экспорта pandas DataFrame или их итераторов
-в форматы CSV, Excel, JSON и Parquet с поддержкой обработки чанками и сжатия.
+Реализует паттерн Strategy для экспорта pandas DataFrame, Arrow-таблиц
+(pa.Table, pa.RecordBatch) или их итераторов в форматы CSV, Excel, JSON
+и Parquet с поддержкой обработки чанками и сжатия.
 Выбор стратегии осуществляется через SaverStrategyFactory по ключу формата.
 
 Классы
@@ -34,42 +133,269 @@ ParquetSaver
 """
     @staticmethod
     def _iter_chunks(data):
-        if isinstance(data, pd.DataFrame):
-            yield data
-        else:
-            yield from data
+        """Одиночный чанк оборачивается в кортеж, итератор чанков возвращается как есть."""
+        if is_single_chunk(data):
+            return (data,)
+        return data
+
+    @staticmethod
+    def _to_arrow(chunk) -> 'pa.Table':
+        """Arrow-чанки передаются как есть, DataFrame конвертируется многопоточно."""
+        if isinstance(chunk, pa.Table):
+            return chunk
+        if isinstance(chunk, pa.RecordBatch):
+            return pa.Table.from_batches([chunk])
+        return pa.Table.from_pandas(chunk, preserve_index=False, nthreads=_ARROW_THREADS)
+
+    @staticmethod
+    def _to_pandas(chunk) -> pd.DataFrame:
+        if pa is not None and isinstance(chunk, (pa.Table, pa.RecordBatch)):
+            return chunk.to_pandas(types_mapper=pd.ArrowDtype)
+        return chunk
+
+    @staticmethod
+    def _is_placeholder(column) -> bool:
+        """
+        Колонка без значений: тип null или заглушка, которую read_sql
+        (dtype_backend='pyarrow') ставит полностью пустой колонке (string).
+        """
+        return pa.types.is_null(column.type) or column.null_count == len(column)
+
+    @staticmethod
+    def _is_string_type(type_) -> bool:
+        return pa.types.is_string(type_) or pa.types.is_large_string(type_)
+
+    def _conform(self, table: 'pa.Table', schema: 'pa.Schema', stringified: set) -> 'pa.Table':
+        """
+        Приводит чанк к схеме файла.
+
+        Пустые колонки и совместимые типы приводятся через безопасный cast.
+        Значения в строковой колонке файла (например, бывшей пустой при выборе
+        схемы) записываются как строки с предупреждением - один раз на колонку,
+        имена таких колонок накапливаются в stringified.
+        """
+        if table.schema.equals(schema):
+            return table
+        for field, column in zip(schema, table.columns):
+            if (column.type == field.type or self._is_placeholder(column)
+                    or not self._is_string_type(field.type) or self._is_string_type(column.type)):
+                continue
+            if field.name not in stringified:
+                stringified.add(field.name)
+                logger.warning("Колонка %s: значения типа %s записываются как %s - тип колонки "
+                               "определён до появления значений", field.name, column.type, field.type)
+        return table.cast(schema)
+
+    def _resolve_schema(self, tables, final: bool) -> Optional['pa.Schema']:
+        """
+        Схема файла по придержанным чанкам: тип колонки берётся из первого
+        чанка, где у неё есть значения. Если такого нет и final=False,
+        возвращает None (нужно ждать следующих чанков); при final=True
+        остаётся тип первого чанка, а null заменяется на string, чтобы
+        колонка могла принять значения из следующих чанков.
+        """
+        fields = []
+        for i, field in enumerate(tables[0].schema):
+            typed = next((t.column(i) for t in tables if not self._is_placeholder(t.column(i))), None)
+            if typed is not None:
+                field = field.with_type(typed.type)
+            elif not final:
+                return None
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            fields.append(field)
+        schema = pa.schema(fields)
+        if schema.equals(tables[0].schema):
+            # pandas-метаданные верны, только если типы совпали с первым чанком
+            return tables[0].schema
+        return schema
+
+    def _iter_tables(self, data) -> Iterator['pa.Table']:
+        """
+        Отдаёт непустые чанки как Arrow-таблицы с единой схемой.
+
+        Схема не фиксируется по первому чанку: пока в чанках есть колонки
+        без значений, чанки придерживаются (не больше _SCHEMA_HOLDBACK_BYTES),
+        и тип такой колонки берётся из первого чанка, где у неё есть значения.
+        """
+        pending = []
+        pending_bytes = 0
+        schema = None
+        stringified = set()
+        for chunk in self._iter_chunks(data):
+            table = self._to_arrow(chunk)
+            if table.num_rows == 0:
+                logger.debug("Пропуск пустого чанка")
+                continue
+            if schema is not None:
+                yield self._conform(table, schema, stringified)
+                continue
+            pending.append(table)
+            pending_bytes += table.nbytes
+            schema = self._resolve_schema(pending, final=pending_bytes >= _SCHEMA_HOLDBACK_BYTES)
+            if schema is not None:
+                for held in pending:
+                    yield self._conform(held, schema, stringified)
+                pending = []
+        if pending:
+            schema = self._resolve_schema(pending, final=True)
+            for held in pending:
+                yield self._conform(held, schema, stringified)
+
+    def _apply_transform(self, data, transform: NumericTransform) -> Iterator[pd.DataFrame]:
+        """
+        Применяет числовую функцию к каждому чанку.
+
+        Все колонки чанка должны быть числовыми: функция получает двумерный
+        float64-массив (пропуски - NaN) и должна вернуть массив той же формы.
+        """
+        for chunk in self._iter_chunks(data):
+            chunk = self._to_pandas(chunk)
+            if chunk.empty:
+                continue
+            arr = transform(chunk.to_numpy(dtype='float64', na_value=np.nan))
+            yield pd.DataFrame(arr, columns=chunk.columns, index=chunk.index, copy=False)
+
+    @staticmethod
+    @contextmanager
+    def _open_output(filepath: Path, compression: Optional[str] = None):
+        """Открывает файл с большим буфером; компрессор пишет в этот буфер."""
+        with open(filepath, 'wb', buffering=_WRITE_BUFFER_SIZE) as raw:
+            if compression is None:
+                yield raw
+                return
+            with _STREAM_COMPRESSORS[compression](raw) as stream:
+                yield stream
 
     @abstractmethod
     def save(self,
-             data: Union[pd.DataFrame, Iterator[pd.DataFrame]],
+             data: Union[Chunk, Iterator[Chunk]],
              filepath: Path,
              compression: Optional[str] = None,
-             metrics_callback: Optional[Callable[[int], None]] = None):
+             metrics_callback: Optional[Callable[[int], None]] = None,
+             transform: Optional[NumericTransform] = None):
+        """
+        transform - необязательная числовая функция над чанком
+        (см. numeric_kernel и SaverStrategy._apply_transform).
+        """
         pass
 
 
 class CsvSaver(SaverStrategy):
-    def save(self, data, filepath, compression=None, metrics_callback: Optional[Callable] = None) -> int:
-        total_rows = 0
-        mode = 'w'
-        header = True
+    """
+    Сохраняет данные в CSV.
 
+    Если установлен pyarrow, каждый чанк пишется через pyarrow.csv.write_csv
+    в один открытый на весь экспорт поток (заголовок - только у первого чанка),
+    при любом сжатии, включая xz, zip и tar: формат значений не зависит
+    от выбранного сжатия. Без pyarrow используется DataFrame.to_csv.
+    """
+    def save(self, data, filepath, compression=None, metrics_callback: Optional[Callable] = None,
+             transform: Optional[NumericTransform] = None) -> int:
+        if transform is not None:
+            data = self._apply_transform(data, transform)
         compression = normalize_compression(compression)
 
         filepath.unlink(missing_ok=True)
         if compression == 'infer':
             compression = None
-        for i, chunk in enumerate(self._iter_chunks(data)):
+        if pa is not None:
+            with self._open_arrow_sink(filepath, compression) as sink:
+                total_rows = self._save_arrow(data, sink, metrics_callback)
+        else:
+            total_rows = self._save_pandas(data, filepath, compression, metrics_callback)
+
+        if total_rows == 0:
+            filepath.unlink(missing_ok=True)
+            logger.warning("Все чанки пусты")
+        return total_rows
+
+    @classmethod
+    @contextmanager
+    def _open_arrow_sink(cls, filepath: Path, compression: Optional[str]):
+        """Открывает поток для write_csv; BOM пишется сразу (как у encoding='utf-8-sig')."""
+        if compression is None or compression in _ARROW_CSV_COMPRESSIONS:
+            sink = pa.BufferedOutputStream(pa.OSFile(str(filepath), 'wb'), _WRITE_BUFFER_SIZE)
+            if compression:
+                # Компрессор пишет в буфер, а не напрямую в файл
+                sink = pa.CompressedOutputStream(sink, compression)
+            try:
+                sink.write(codecs.BOM_UTF8)
+                yield sink
+            finally:
+                sink.close()
+            return
+
+        # Имя CSV внутри архива - имя файла без расширения архива, как у pandas
+        member = filepath.stem if filepath.suffix in ('.zip', '.tar') else filepath.name
+        if compression in _STREAM_COMPRESSORS:
+            with cls._open_output(filepath, compression) as fh:
+                fh.write(codecs.BOM_UTF8)
+                yield fh
+        elif compression == 'zip':
+            with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zf, \
+                    zf.open(member, 'w', force_zip64=True) as fh:
+                fh.write(codecs.BOM_UTF8)
+                yield fh
+        elif compression == 'tar':
+            # Размер члена tar нужен заранее, поэтому CSV сначала пишется во временный файл
+            with tempfile.TemporaryFile(dir=filepath.parent) as tmp:
+                tmp.write(codecs.BOM_UTF8)
+                yield tmp
+                info = tarfile.TarInfo(member)
+                info.size = tmp.tell()
+                info.mtime = int(dt.datetime.now().timestamp())
+                tmp.seek(0)
+                with tarfile.open(filepath, 'w') as tar:
+                    tar.addfile(info, tmp)
+        else:
+            raise ValueError(f"Сжатие {compression} не поддерживается для CSV")
+
+    def _save_arrow(self, data, sink, metrics_callback) -> int:
+        total_rows = 0
+        write_options = pacsv.WriteOptions(include_header=True)
+        for chunk in self._iter_chunks(data):
+            table = self._to_arrow(chunk)
+            if table.num_rows == 0:
+                logger.debug("Пропуск пустого чанка")
+                continue
+
+            # У CSV нет схемы файла: каждый чанк пишется со своими типами
+            pacsv.write_csv(table, sink, write_options=write_options)
+            write_options = pacsv.WriteOptions(include_header=False)
+
+            if metrics_callback:
+                metrics_callback(table.num_rows)
+
+            total_rows += table.num_rows
+            logger.info("Успешно записан чанк из %d строк", table.num_rows)
+        return total_rows
+
+    def _save_pandas(self, data, filepath, compression, metrics_callback) -> int:
+        if compression is None or compression in _STREAM_COMPRESSORS:
+            # Без pyarrow: один открытый поток на весь экспорт вместо открытия файла на каждый чанк
+            with self._open_output(filepath, compression) as fh:
+                fh.write(codecs.BOM_UTF8)
+                return self._write_pandas_chunks(data, metrics_callback, fh, mode='wb', encoding='utf-8')
+        # Архивы zip/tar нельзя дописывать потоком, поэтому каждый чанк пишется по пути
+        return self._write_pandas_chunks(data, metrics_callback, filepath, mode='w', encoding='utf-8-sig',
+                                         compression=compression)
+
+    def _write_pandas_chunks(self, data, metrics_callback, path_or_buf, mode, encoding, compression=None) -> int:
+        total_rows = 0
+        header = True
+        for chunk in self._iter_chunks(data):
+            chunk = self._to_pandas(chunk)
             if chunk.empty:
                 logger.debug("Пропуск пустого чанка")
                 continue
 
             chunk.to_csv(
-                path_or_buf=filepath,
+                path_or_buf=path_or_buf,
                 mode=mode,
                 header=header,
                 index=False,
-                encoding='utf-8-sig',
+                encoding=encoding,
                 compression=compression
             )
 
@@ -77,52 +403,103 @@ class CsvSaver(SaverStrategy):
                 metrics_callback(len(chunk))
 
             total_rows += len(chunk)
-            mode = 'a'
+            mode = mode.replace('w', 'a')
             header = False
-            logger.info(f"Успешно записан чанк из {len(chunk)} строк")
-
-        if total_rows == 0:
-            logger.warning("Все чанки пусты")
+            logger.info("Успешно записан чанк из %d строк", len(chunk))
         return total_rows
 
 
 class ExcelSaver(SaverStrategy):
-    def save(self, data, filepath, compression=None, metrics_callback: Optional[Callable] = None) -> int:
+    """
+    Сохраняет данные в Excel (xlsx).
+
+    Использует книгу openpyxl в режиме write_only: строки потоково пишутся
+    в лист, поэтому память не растёт с числом чанков.
+    """
+    def save(self, data, filepath, compression=None, metrics_callback: Optional[Callable] = None,
+             transform: Optional[NumericTransform] = None) -> int:
+        if transform is not None:
+            data = self._apply_transform(data, transform)
+        from openpyxl import Workbook
+
         compression = normalize_compression(compression)
         if compression and compression != 'infer':
             raise ValueError("Excel format doesn't support compression")
         total_rows = 0
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            startrow = 0
-            for chunk in self._iter_chunks(data):
-                if chunk.empty:
-                    logger.debug("Пропуск пустого чанка")
-                    continue
-
-                chunk.to_excel(
-                    writer,
-                    sheet_name='Data',
-                    index=False,
-                    startrow=startrow
-                )
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Data')
+        header_written = False
+        for chunk in self._iter_chunks(data):
+            chunk = self._to_pandas(chunk)
+            if chunk.empty:
+                logger.debug("Пропуск пустого чанка")
+                continue
 
-                if metrics_callback:
-                    metrics_callback(len(chunk))
+            if not header_written:
+                ws.append(list(chunk.columns))
+                header_written = True
+            # openpyxl не принимает pd.NA/NaT - заменяем пропуски на пустые ячейки
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                ws.append(row)
 
-                startrow += len(chunk)
-                total_rows += len(chunk)
+            if metrics_callback:
+                metrics_callback(len(chunk))
 
-                logger.info(f"Успешно записан чанк из {len(chunk)} строк")
+            total_rows += len(chunk)
 
+            logger.info("Успешно записан чанк из %d строк", len(chunk))
+
+        wb.save(filepath)
         return total_rows
 
 
 class JsonSaver(SaverStrategy):
-    def save(self, data, filepath, compression=None, metrics_callback: Optional[Callable] = None) -> int:
+    """
+    Сохраняет данные в JSON Lines.
+
+    Строки сериализуются orjson и пишутся в один открытый на весь экспорт
+    поток (со сжатием gzip, bz2, xz или zstd). Для zip и tar используется
+    DataFrame.to_json. Даты и время записываются в ISO 8601.
+    """
+    def save(self, data, filepath, compression=None, metrics_callback: Optional[Callable] = None,
+             transform: Optional[NumericTransform] = None) -> int:
+        if transform is not None:
+            data = self._apply_transform(data, transform)
         compression = normalize_compression(compression)
+        if compression == 'infer':
+            compression = None
+        if compression is None or compression in _STREAM_COMPRESSORS:
+            with self._open_output(filepath, compression) as fh:
+                total_rows = self._write_orjson(data, fh, metrics_callback)
+        else:
+            total_rows = self._write_pandas(data, filepath, compression, metrics_callback)
+        if total_rows == 0:
+            logger.warning("Все чанки пусты")
+        return total_rows
+
+    def _write_orjson(self, data, fh, metrics_callback) -> int:
+        total_rows = 0
+        for chunk in self._iter_chunks(data):
+            chunk = self._to_pandas(chunk)
+            if chunk.empty:
+                continue
+            # Колонки материализуются целиком (tolist в C), строки собираются через zip
+            cols = list(chunk.columns)
+            col_lists = [chunk.iloc[:, i].tolist() for i in range(len(cols))]
+            fh.write(b'\n'.join(orjson.dumps(dict(zip(cols, vals)), default=_json_default, option=_ORJSON_OPTIONS)
+                                for vals in zip(*col_lists)))
+            fh.write(b'\n')
+            if metrics_callback:
+                metrics_callback(len(chunk))
+            total_rows += len(chunk)
+        return total_rows
+
+    def _write_pandas(self, data, filepath, compression, metrics_callback) -> int:
         total_rows = 0
         mode = 'w'
         for chunk in self._iter_chunks(data):
+            chunk = self._to_pandas(chunk)
             if chunk.empty:
                 continue
             chunk.to_json(
@@ -139,20 +516,47 @@ class JsonSaver(SaverStrategy):
                 metrics_callback(len(chunk))
             total_rows += len(chunk)
             mode = 'a'  # После первого чанка - дозапись
-        if total_rows == 0:
-            logger.warning("Все чанки пусты")
         return total_rows
 
 
 class ParquetSaver(SaverStrategy):
-    def save(self, data: Union[pd.DataFrame, Iterator[pd.DataFrame]], filepath: Path,
-             compression: Optional[str] = None, metrics_callback: Optional[Callable] = None) -> int:
+    """
+    Сохраняет данные в Parquet.
+
+    Открывает один pyarrow.parquet.ParquetWriter на весь поток чанков:
+    каждый чанк становится row group в одном файле. Схема файла
+    определяется через SaverStrategy._iter_tables. Без сжатия (None)
+    файл пишется несжатым, неизвестные Parquet кодеки заменяются на zstd.
+    """
+    def save(self, data: Union[Chunk, Iterator[Chunk]], filepath: Path,
+             compression: Optional[str] = None, metrics_callback: Optional[Callable] = None,
+             transform: Optional[NumericTransform] = None) -> int:
+        if pq is None:
+            raise ImportError("Для экспорта в Parquet требуется pyarrow")
+        if transform is not None:
+            data = self._apply_transform(data, transform)
+        compression = normalize_compression(compression)
+        if compression is None:
+            compression = 'none'
+        elif compression not in _PARQUET_COMPRESSIONS:
+            compression = 'zstd'
         total_rows = 0
-        for chunk in self._iter_chunks(data):
-            if chunk.empty:
-                continue
-            chunk.to_parquet(filepath, compression=compression, index=False)
-            if metrics_callback:
-                metrics_callback(len(chunk))
-            total_rows += len(chunk)
+        writer = None
+        try:
+            for table in self._iter_tables(data):
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        str(filepath),
+                        table.schema,
+                        compression=compression,
+                        use_dictionary=True,
+                        data_page_size=1 << 20
+                    )
+                writer.write_table(table)
+                if metrics_callback:
+                    metrics_callback(table.num_rows)
+                total_rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
         return total_rows